@@ -5,13 +5,107 @@ Generates mock camera feeds using PIL instead of requiring real cameras.
 """
 import json
 import io
+import math
 import time
 import os
 import argparse
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 import datetime
 from PIL import Image, ImageDraw, ImageFont
 
+import hotreload
+import netem
+
+
+# Summary bucket widths in seconds, keyed by the ?bucket= value
+SUMMARY_BUCKETS = {"hour": 3600, "day": 86400}
+
+
+class EventAggregates:
+    """Event counts by camera, label and zone, overall and per age bucket.
+
+    Events in the template are placed relative to "now" (start_offset_sec),
+    so buckets are keyed by age: bucket k of width w holds events with
+    k*w < age <= (k+1)*w, i.e. a start_time in the bucket's half-open
+    [start_time, end_time) range. Events starting "now" (age 0) also land
+    in bucket 0. That keeps the counts stable over time and lets
+    /api/events/summary cost O(buckets).
+    """
+
+    def __init__(self):
+        self.totals = self._new_bucket()
+        self.buckets = {name: {} for name in SUMMARY_BUCKETS}
+
+    @staticmethod
+    def _new_bucket():
+        return {"count": 0, "by_camera": Counter(), "by_label": Counter(),
+                "by_zone": Counter()}
+
+    @staticmethod
+    def _bump(bucket, ev, sign):
+        bucket["count"] += sign
+        dims = [("by_camera", [ev.get("camera")]),
+                ("by_label", [ev.get("label")]),
+                ("by_zone", set(ev.get("zones") or []))]
+        for dim, keys in dims:
+            counter = bucket[dim]
+            for key in keys:
+                counter[key] += sign
+                if counter[key] <= 0:
+                    del counter[key]
+
+    def add(self, ev, sign=1):
+        """Count (sign=1) or uncount (sign=-1) one template event."""
+        offset = float(ev.get("start_offset_sec", 0))
+        self._bump(self.totals, ev, sign)
+        for name, width in SUMMARY_BUCKETS.items():
+            buckets = self.buckets[name]
+            index = max(0, math.ceil(offset / width) - 1)
+            bucket = buckets.setdefault(index, self._new_bucket())
+            self._bump(bucket, ev, sign)
+            if bucket["count"] <= 0:
+                del buckets[index]
+
+    def copy(self):
+        """Copy for copy-on-write updates; O(buckets), not O(events)."""
+        other = EventAggregates()
+        other.totals = self._copy_bucket(self.totals)
+        other.buckets = {
+            name: {i: self._copy_bucket(b) for i, b in buckets.items()}
+            for name, buckets in self.buckets.items()
+        }
+        return other
+
+    @staticmethod
+    def _copy_bucket(bucket):
+        return {"count": bucket["count"],
+                "by_camera": Counter(bucket["by_camera"]),
+                "by_label": Counter(bucket["by_label"]),
+                "by_zone": Counter(bucket["by_zone"])}
+
+    def summary(self, bucket_name, now):
+        """Render the summary for one bucket width, newest bucket first."""
+        width = SUMMARY_BUCKETS[bucket_name]
+
+        def render(bucket):
+            return {"count": bucket["count"],
+                    "by_camera": dict(bucket["by_camera"]),
+                    "by_label": dict(bucket["by_label"]),
+                    "by_zone": dict(bucket["by_zone"])}
+
+        rows = []
+        for index in sorted(self.buckets[bucket_name]):
+            row = {"start_time": now - (index + 1) * width,
+                   "end_time": now - index * width}
+            row.update(render(self.buckets[bucket_name][index]))
+            rows.append(row)
+        result = {"bucket": bucket_name, "bucket_seconds": width}
+        result.update(render(self.totals))
+        result["buckets"] = rows
+        return result
+
 
 class FrigateHandler(BaseHTTPRequestHandler):
     """
@@ -26,7 +120,8 @@ class FrigateHandler(BaseHTTPRequestHandler):
             {"version": str, "latest_version": str, "update_available": bool}
     - GET /api/config
         - Returns the simulation configuration as JSON.
-        - Reads configuration from self.server.sim_config if present.
+        - Reads configuration from self.server.fixtures["sim_config"] \
+            if present.
         - If not present, returns a minimal default config:
             {"cameras": {}, "mqtt": {"enabled": False}}.
     - GET /api/events/{event_id}/thumbnail.jpg
@@ -36,7 +131,7 @@ class FrigateHandler(BaseHTTPRequestHandler):
             extracted from the path.
     - GET /api/events
         - Builds and returns a JSON list of event objects derived from
-            self.server.events_template (expected to be an iterable of \
+            self.server.fixtures["events_template"] (an iterable of \
             dict-like templates).
         - For each template event:
             - start_offset_sec (optional) is interpreted as seconds \
@@ -51,6 +146,15 @@ class FrigateHandler(BaseHTTPRequestHandler):
                 excludes the template-only fields start_offset_sec \
                 and duration_sec.
         - Uses time.time() as the reference "now".
+    - GET /api/events/summary[?bucket=hour|day]
+        - Returns event counts overall and per time bucket (default day),
+            each broken down by camera, label and zone (an event counts
+            once per zone it entered). Buckets carry start_time/end_time
+            and hold events with start_time in [start_time, end_time);
+            only non-empty buckets are listed, newest first.
+        - Served from self.server.fixtures["event_aggregates"], so the
+            cost depends on the number of buckets, not events.
+        - Unknown bucket values return a 400 JSON error.
     - GET /api/stats
         - Returns a JSON object with example statistics:
             {"cpu_usages": {...}, "detectors": {...}, "service": \
@@ -62,9 +166,8 @@ class FrigateHandler(BaseHTTPRequestHandler):
     Fallback behavior:
     - Any other path returns a 404 JSON response \
         {"error": "Not found"} with
-        Content-Type: application/json. The method uses \
-        send_response, send_header,
-        end_headers and writes JSON bytes to self.wfile for raw responses.
+        Content-Type: application/json, sent through \
+        send_json(..., status=404) so netem throttling applies to it.
     Notes and side effects:
     - This method relies on helper methods provided by the \
         request handler class:
@@ -73,15 +176,25 @@ class FrigateHandler(BaseHTTPRequestHandler):
         image bytes for an event.
         - self.send_camera_snapshot(camera_name): send latest \
         camera image bytes.
-    - It also expects optional attributes on self.server:
+    - It also expects self.server.fixtures, a dict snapshot holding:
         - sim_config: dictionary to use for /api/config.
         - events_template: list of event template dictionaries \
         used to synthesize /api/events.
+        - event_id_map: event id -> label/camera index for thumbnails.
+        - event_aggregates: EventAggregates backing /api/events/summary.
+        The snapshot is replaced wholesale on hot reload, so each \
+        lookup reads self.server.fixtures once.
     - Time-dependent behavior: /api/events computes \
         start_time and end_time using the
         current time at request handling, so responses vary over time.
+    - If self.server.netem_profile is set, the matching route's latency,
+        error/stall injection and bandwidth throttling (see netem.py) are
+        applied before dispatch and to the response body.
     """
     def do_GET(self):
+        parsed = urlparse(self.path)
+        if not netem.apply(self, "GET", parsed.path):
+            return
         if self.path == "/api/version":
             self.send_json({
                 "version": "0.13.2-simulation",
@@ -90,7 +203,7 @@ class FrigateHandler(BaseHTTPRequestHandler):
             })      
         elif self.path == "/api/config":
             # Serve config from external file; fallback to minimal default
-            config = getattr(self.server, "sim_config", None)
+            config = self.server.fixtures.get("sim_config")
             if not config:
                 config = {"cameras": {}, "mqtt": {"enabled": False}}
             self.send_json(config)
@@ -101,8 +214,18 @@ class FrigateHandler(BaseHTTPRequestHandler):
             event_id = self.path.split("/")[3]
             self.send_event_thumbnail(event_id)
 
+        elif parsed.path == "/api/events/summary":
+            bucket = parse_qs(parsed.query).get("bucket", ["day"])[0]
+            if bucket not in SUMMARY_BUCKETS:
+                self.send_json({
+                    "error": f"Invalid bucket '{bucket}'; expected one of "
+                             f"{', '.join(SUMMARY_BUCKETS)}"}, status=400)
+                return
+            aggregates = self.server.fixtures["event_aggregates"]
+            self.send_json(aggregates.summary(bucket, time.time()))
+
         elif self.path.startswith("/api/events"):
-            template = getattr(self.server, "events_template", [])
+            template = self.server.fixtures.get("events_template", [])
             now = time.time()
             events = []
             for ev in template:
@@ -133,17 +256,14 @@ class FrigateHandler(BaseHTTPRequestHandler):
             camera_name = self.path.split("/")[2]
             self.send_camera_snapshot(camera_name)
         else:
-            self.send_response(404)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": "Not found"}).encode())
+            self.send_json({"error": "Not found"}, status=404)
     
-    def send_json(self, data):
-        self.send_response(200)
+    def send_json(self, data, status=200):
+        self.send_response(status)
         self.send_header("Content-Type", "application/json")
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        netem.write_body(self, json.dumps(data).encode())
     
     def send_camera_snapshot(self, camera_name):
         """Generate a mock camera snapshot with PIL"""
@@ -195,7 +315,7 @@ class FrigateHandler(BaseHTTPRequestHandler):
         self.send_header("Content-Length", str(len(buffer.getvalue())))
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
-        self.wfile.write(buffer.getvalue())
+        netem.write_body(self, buffer.getvalue())
     
     def send_event_thumbnail(self, event_id):
         """Generate a mock event thumbnail with event details"""
@@ -214,7 +334,7 @@ class FrigateHandler(BaseHTTPRequestHandler):
             font_small = ImageFont.load_default()
         
         # Look up label and camera from preloaded template mapping
-        mapping = getattr(self.server, "event_id_map", {})
+        mapping = self.server.fixtures.get("event_id_map", {})
         info = mapping.get(event_id, {"label": "unknown", "camera": "Unknown"})
         label = info.get("label", "unknown")
         camera = "Front Door" if info.get("camera") == "front_door" \
@@ -253,34 +373,20 @@ class FrigateHandler(BaseHTTPRequestHandler):
         self.send_header("Content-Length", str(len(buffer.getvalue())))
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
-        self.wfile.write(buffer.getvalue())
+        netem.write_body(self, buffer.getvalue())
     
     def log_message(self, format, *args):
         pass  # Suppress HTTP request logs
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(
-        description="Run the Frigate simulation server")
-    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"),
-                        help="Host interface to bind")
-    parser.add_argument("--port", type=int, default=int(os.environ.get(
-        "PORT", "5000")),
-                        help="Port to listen on")
-    parser.add_argument("--events-file", default=os.environ.get(
-        "EVENTS_FILE", None),
-                        help="Path to events template JSON")
-    parser.add_argument("--config-file", default=os.environ.get(
-        "CONFIG_FILE", None),
-                        help="Path to config JSON")
-    args = parser.parse_args()
+def resolve_data_dir():
+    """Locate the simulation data directory.
 
-    # Resolve default data file paths with sensible fallbacks
-    # Priority:
-    # 1) Explicit --events-file / --config-file args
-    # 2) DATA_DIR env var (if provided)
-    # 3) /opt/crooked-services/data (inside simulator container)
-    # 4) <repo>/simulation/data relative to this script (when run from repo)
+    Priority:
+    1) DATA_DIR env var (if provided)
+    2) /opt/crooked-services/data (inside simulator container)
+    3) <repo>/simulation/data relative to this script (when run from repo)
+    """
     data_dir_candidates = []
     if os.environ.get("DATA_DIR"):
         data_dir_candidates.append(os.environ["DATA_DIR"])  # explicit override
@@ -290,52 +396,156 @@ if __name__ == "__main__":
     repo_guess = os.path.abspath(os.path.join(script_root, os.pardir, os.pardir, "simulation", "data"))
     data_dir_candidates.append(repo_guess)
 
-    def first_existing(path_list):
-        for p in path_list:
-            if p and os.path.isdir(p):
-                return p
-        return None
+    for p in data_dir_candidates:
+        if p and os.path.isdir(p):
+            return p
+    return None
 
-    resolved_data_dir = first_existing(data_dir_candidates)
-    default_events = os.path.join(resolved_data_dir, "events.template.json") if resolved_data_dir else None
-    default_config = os.path.join(resolved_data_dir, "config.json") if resolved_data_dir else None
 
-    events_path = args.events_file or default_events
-    config_path = args.config_file or default_config
+def index_events(events_template, previous=None):
+    """Build the events part of a fixtures snapshot.
 
-    # Preload config and events template
-    sim_config = None
-    events_template = []
+    Returns the template, the event id index and the summary aggregates.
+    If previous (the old snapshot) is given, its aggregates are copied and
+    adjusted only for events that were added, removed or edited.
+    """
     event_id_map = {}
+    for ev in events_template:
+        event_id_map[ev.get("id")] = {"label": ev.get("label"), 
+                                      "camera": ev.get("camera")}
+
+    if previous is None:
+        aggregates = EventAggregates()
+        for ev in events_template:
+            aggregates.add(ev)
+    else:
+        def canonical(events):
+            return Counter(json.dumps(ev, sort_keys=True) for ev in events)
+
+        old = canonical(previous["events_template"])
+        new = canonical(events_template)
+        aggregates = previous["event_aggregates"].copy()
+        for key, n in (old - new).items():
+            for _ in range(n):
+                aggregates.add(json.loads(key), -1)
+        for key, n in (new - old).items():
+            for _ in range(n):
+                aggregates.add(json.loads(key))
+    return {"events_template": events_template, "event_id_map": event_id_map,
+            "event_aggregates": aggregates}
+
+
+def load_fixtures(config_path, events_path):
+    """Load config and events template and build the event id index.
+
+    Returns a fixtures dict (sim_config, events_template, event_id_map,
+    event_aggregates). The handler never mutates it, so several servers
+    may share it.
+    """
+    fixtures = {"sim_config": None}
+    fixtures.update(index_events([]))
     try:
         if config_path and os.path.exists(config_path):
             with open(config_path, "r") as f:
-                sim_config = json.load(f)
+                fixtures["sim_config"] = json.load(f)
     except (OSError, json.JSONDecodeError) as e:
         print(f"Warning: failed to load config.json: {e}")
-        sim_config = None
     try:
         if events_path and os.path.exists(events_path):
             with open(events_path, "r") as f:
-                events_template = json.load(f)
-            for ev in events_template:
-                event_id_map[ev.get("id")] = {"label": ev.get("label"), 
-                                              "camera": ev.get("camera")}
+                fixtures.update(index_events(json.load(f)))
     except (OSError, json.JSONDecodeError) as e:
         print(f"Warning: failed to load events.template.json: {e}")
-        events_template = []
+    return fixtures
+
+
+def reload_fixture(server, config_path, events_path, changed_path):
+    """Re-read one changed fixture file and swap in a new snapshot.
+
+    Only the parts derived from changed_path are rebuilt; the rest of the
+    snapshot is carried over. Parse errors propagate so the old snapshot
+    stays in place.
+    """
+    with open(changed_path, "r") as f:
+        data = json.load(f)
+    fixtures = dict(server.fixtures)
+    if changed_path == config_path:
+        fixtures["sim_config"] = data
+    elif changed_path == events_path:
+        fixtures.update(index_events(data, previous=server.fixtures))
+    server.fixtures = fixtures
+
+
+def watch_fixtures(server, config_path, events_path, interval):
+    """Hot-reload config/events into server when they change on disk."""
+    return hotreload.watch(
+        [config_path, events_path],
+        lambda path: reload_fixture(server, config_path, events_path, path),
+        interval)
+
 
-    server = HTTPServer((args.host, args.port), FrigateHandler)
+def create_server(host, port, fixtures, netem_profile=None):
+    """Create a Frigate simulation server with preloaded fixtures attached.
+
+    Requests are handled on their own threads so emulated slowness on one
+    connection (netem_profile) doesn't stall the others.
+    """
+    server = ThreadingHTTPServer((host, port), FrigateHandler)
     # Attach preloaded data to server for handler access
-    server.sim_config = sim_config
-    server.events_template = events_template
-    server.event_id_map = event_id_map
+    server.fixtures = fixtures
+    server.netem_profile = netem_profile
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run the Frigate simulation server")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"),
+                        help="Host interface to bind")
+    parser.add_argument("--port", type=int, default=int(os.environ.get(
+        "PORT", "5000")),
+                        help="Port to listen on")
+    parser.add_argument("--events-file", default=os.environ.get(
+        "EVENTS_FILE", None),
+                        help="Path to events template JSON")
+    parser.add_argument("--config-file", default=os.environ.get(
+        "CONFIG_FILE", None),
+                        help="Path to config JSON")
+    parser.add_argument("--netem-profile", default=os.environ.get(
+        "NETEM_PROFILE", None),
+                        help="Path to network emulation profile JSON")
+    parser.add_argument("--watch-interval", type=float, default=float(
+        os.environ.get("WATCH_INTERVAL", "1.0")),
+                        help="Seconds between fixture change checks "
+                             "(0 disables hot reload)")
+    args = parser.parse_args()
+
+    # Resolve default data file paths with sensible fallbacks; explicit
+    # --events-file / --config-file args take priority
+    resolved_data_dir = resolve_data_dir()
+    default_events = os.path.join(resolved_data_dir, "events.template.json") if resolved_data_dir else None
+    default_config = os.path.join(resolved_data_dir, "config.json") if resolved_data_dir else None
+
+    events_path = args.events_file or default_events
+    config_path = args.config_file or default_config
+
+    try:
+        netem_profile = netem.load_profile(args.netem_profile)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Preload config and events template
+    fixtures = load_fixtures(config_path, events_path)
+
+    server = create_server(args.host, args.port, fixtures, netem_profile)
+    watch_fixtures(server, config_path, events_path, args.watch_interval)
     print(f"🎥 Frigate simulation with mock camera feeds running on\
           {args.host}:{args.port}")
     print("   API endpoints:")
     print("   - GET /api/version")
     print("   - GET /api/config")
     print("   - GET /api/events (20 mock events)")
+    print("   - GET /api/events/summary?bucket=hour|day")
     print("   - GET /api/stats")
     print("   - GET /api/front_door/latest.jpg")
     print("   - GET /api/backyard/latest.jpg")
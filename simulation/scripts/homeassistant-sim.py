@@ -3,19 +3,50 @@
 Home Assistant API Simulation Server
 Provides a mock Home Assistant API for testing integrations.
 """
+import copy
 import json
 import time
 import os
 import argparse
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 from datetime import datetime
 
+import hotreload
+import netem
+
+
+def record_change(server, entity):
+    """Stamp a mutated entity with the next global revision.
+
+    Revisions restart with every server, so clients see them as
+    "<epoch>-<rev>" tokens (see revision_token). server.ha_changes maps
+    entity_id -> (revision, entity) ordered by revision, so re-recording an
+    entity moves it to the end. A delta for ?since=<rev> then only walks
+    entries newer than <rev>.
+    """
+    server.ha_revision += 1
+    changes = server.ha_changes
+    entity_id = entity.get("entity_id")
+    changes.pop(entity_id, None)
+    changes[entity_id] = (server.ha_revision, entity)
+    return server.ha_revision
+
+
+def revision_token(server, revision):
+    """Client-facing revision: the server's boot epoch plus the counter."""
+    return f"{server.ha_epoch}-{revision}"
+
 
 class HomeAssistantHandler(BaseHTTPRequestHandler):
     
     def do_GET(self):
-        path = urlparse(self.path).path
+        parsed = urlparse(self.path)
+        path = parsed.path
+        if not netem.apply(self, "GET", path):
+            return
         
         if path == "/api/":
             # API discovery endpoint
@@ -58,9 +89,24 @@ class HomeAssistantHandler(BaseHTTPRequestHandler):
             })
         
         elif path == "/api/states":
-            # All entity states
-            states = getattr(self.server, "ha_states", [])
-            self.send_json(states)
+            query = parse_qs(parsed.query)
+            if "since" in query:
+                # Incremental delta: only entities changed after the token
+                epoch, _, rev = query["since"][0].rpartition("-")
+                try:
+                    since = int(rev)
+                except ValueError:
+                    self.send_error(400, "Invalid since revision")
+                    return
+                if epoch != self.server.ha_epoch:
+                    # Token from another server lifetime: full resync
+                    since = 0
+                self.send_state_delta(since)
+            else:
+                # All entity states
+                token = revision_token(self.server, self.server.ha_revision)
+                states = getattr(self.server, "ha_states", [])
+                self.send_json(states, headers={"X-HA-Revision": token})
         
         elif path.startswith("/api/states/"):
             # Get state for specific entity
@@ -112,6 +158,8 @@ class HomeAssistantHandler(BaseHTTPRequestHandler):
     
     def do_POST(self):
         path = urlparse(self.path).path
+        if not netem.apply(self, "POST", path):
+            return
         content_length = int(self.headers.get('Content-Length', 0))
         body = self.rfile.read(content_length) if content_length > 0 else b'{}'
         
@@ -147,7 +195,20 @@ class HomeAssistantHandler(BaseHTTPRequestHandler):
         if data:
             print(f"   Data: {json.dumps(data, indent=2)}")
         
-        # Update state based on service call
+        with self.server.ha_lock:
+            self.apply_service_call(domain, service, entity_id, data)
+        
+        # Return success response
+        self.send_json([{
+            "context": {
+                "id": f"sim{int(time.time())}",
+                "parent_id": None,
+                "user_id": None
+            }
+        }])
+    
+    def apply_service_call(self, domain, service, entity_id, data):
+        """Mutate entity state for a service call (caller holds ha_lock)"""
         if domain == "media_player" and entity_id:
             states = getattr(self.server, "ha_states", [])
             entity = next(
@@ -182,6 +243,7 @@ class HomeAssistantHandler(BaseHTTPRequestHandler):
                 
                 entity["last_updated"] = now
                 entity["last_changed"] = now
+                record_change(self.server, entity)
 
         elif domain == "climate" and entity_id:
             states = getattr(self.server, "ha_states", [])
@@ -268,18 +330,16 @@ class HomeAssistantHandler(BaseHTTPRequestHandler):
 
                 entity["last_updated"] = now
                 entity["last_changed"] = now
-        
-        # Return success response
-        self.send_json([{
-            "context": {
-                "id": f"sim{int(time.time())}",
-                "parent_id": None,
-                "user_id": None
-            }
-        }])
+                record_change(self.server, entity)
     
     def handle_state_update(self, entity_id, data):
         """Handle direct state updates via POST to /api/states/<id>"""
+        with self.server.ha_lock:
+            entity = self.apply_state_update(entity_id, data)
+        self.send_json(entity)
+    
+    def apply_state_update(self, entity_id, data):
+        """Update or create an entity (caller holds ha_lock)"""
         states = getattr(self.server, "ha_states", [])
         entity = next(
             (s for s in states if s.get("entity_id") == entity_id),
@@ -296,30 +356,79 @@ class HomeAssistantHandler(BaseHTTPRequestHandler):
                 entity["attributes"].update(data["attributes"])
             entity["last_updated"] = now
             entity["last_changed"] = now
-            self.send_json(entity)
-        else:
-            # Create new entity
-            new_entity = {
-                "entity_id": entity_id,
-                "state": data.get("state", "unknown"),
-                "attributes": data.get("attributes", {}),
-                "last_changed": now,
-                "last_updated": now,
-                "context": {
-                    "id": f"sim{int(time.time())}",
-                    "parent_id": None,
-                    "user_id": None
-                }
+            record_change(self.server, entity)
+            return entity
+        
+        # Create new entity
+        new_entity = {
+            "entity_id": entity_id,
+            "state": data.get("state", "unknown"),
+            "attributes": data.get("attributes", {}),
+            "last_changed": now,
+            "last_updated": now,
+            "context": {
+                "id": f"sim{int(time.time())}",
+                "parent_id": None,
+                "user_id": None
             }
-            states.append(new_entity)
-            self.send_json(new_entity)
+        }
+        states.append(new_entity)
+        record_change(self.server, new_entity)
+        return new_entity
     
-    def send_json(self, data):
+    def send_state_delta(self, since):
+        """Serve GET /api/states?since=<epoch>-<rev>.
+
+        Returns {"revision": <current token>, "states": [...]} with only the
+        entities changed after <rev>, walking the change index newest-first
+        so the cost is O(changes). An up-to-date client gets a bodiless 304.
+        Callers pass since=0 for tokens from another epoch (a restarted
+        server), which returns everything.
+        """
+        with self.server.ha_lock:
+            revision = self.server.ha_revision
+            if since > revision:
+                since = 0
+            changed = []
+            for rev, entity in reversed(self.server.ha_changes.values()):
+                if rev <= since:
+                    break
+                changed.append(entity)
+            changed.reverse()
+            token = revision_token(self.server, revision)
+            body = json.dumps({"revision": token, "states": changed}).encode()
+
+        if since == revision:
+            self.send_response(304)
+            self.send_header("ETag", f'"{token}"')
+            self.send_header("X-HA-Revision", token)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            return
+        self.send_body(body, headers={
+            "ETag": f'"{token}"',
+            "X-HA-Revision": token
+        })
+
+    def send_json(self, data, headers=None):
+        """Send data as JSON.
+
+        Encoding happens under ha_lock so entities aren't serialized
+        mid-mutation; the (possibly throttled) write happens outside it.
+        """
+        with self.server.ha_lock:
+            body = json.dumps(data).encode()
+        self.send_body(body, headers)
+
+    def send_body(self, body, headers=None):
+        """Send an already encoded JSON body (bytes) with a 200 status."""
         self.send_response(200)
         self.send_header("Content-Type", "application/json")
         self.send_header("Access-Control-Allow-Origin", "*")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        netem.write_body(self, body)
     
     def send_error(self, code, message=None, explain=None):
         # Emit JSON errors instead of HTML
@@ -328,12 +437,128 @@ class HomeAssistantHandler(BaseHTTPRequestHandler):
         self.send_header("Content-Type", "application/json")
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
-        self.wfile.write(json.dumps(payload).encode())
+        netem.write_body(self, json.dumps(payload).encode())
     
     def log_message(self, fmt, *fmt_args):
         pass  # Suppress HTTP request logs
 
 
+def load_state_template(path, label):
+    """Load one entity state fixture, or None if missing/invalid."""
+    try:
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+                print(f"✅ Loaded {label} state from {path}")
+                return state
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: failed to load {os.path.basename(path)}: {e}")
+    return None
+
+
+def load_services(path):
+    """Load the services fixture; falls back to an empty domain list."""
+    try:
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                services = json.load(f)
+                print(f"✅ Loaded services from {path}")
+                return services
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: failed to load services.json: {e}")
+    return {"domains": []}
+
+
+def instantiate_states(templates):
+    """Build a fresh, mutable entity list from state fixtures.
+
+    Templates are deep-copied so instances sharing them never see each
+    other's mutations; timestamps are reset to now.
+    """
+    now_ts = datetime.utcnow().isoformat() + "Z"
+    states = []
+    for template in templates:
+        if template is None:
+            continue
+        state = copy.deepcopy(template)
+        state["last_changed"] = now_ts
+        state["last_updated"] = now_ts
+        states.append(state)
+    return states
+
+
+def create_server(host, port, ha_states, ha_services, netem_profile=None):
+    """Create an HA simulation server bound to host:port.
+
+    ha_states is owned (and mutated) by this server; ha_services is only
+    read and may be shared between servers. Requests run on their own
+    threads, so mutations and change-index reads go through ha_lock.
+    """
+    server = ThreadingHTTPServer((host, port), HomeAssistantHandler)
+    server.ha_states = ha_states
+    server.ha_services = ha_services
+    server.ha_lock = threading.RLock()
+    server.netem_profile = netem_profile
+    # Revision counter and change index backing /api/states?since=<rev>;
+    # the epoch tells tokens from a previous run apart from current ones
+    server.ha_epoch = str(time.time_ns())
+    server.ha_revision = 0
+    server.ha_changes = OrderedDict()
+    for state in ha_states:
+        record_change(server, state)
+    return server
+
+
+def reload_state(server, template):
+    """Swap a reloaded state fixture into a running server.
+
+    Only the entity with the template's entity_id is replaced (or added);
+    mutated state on every other entity survives. The swap is recorded as a
+    change so ?since= pollers pick it up.
+    """
+    entity = instantiate_states([template])[0]
+    with server.ha_lock:
+        states = server.ha_states
+        for i, state in enumerate(states):
+            if state.get("entity_id") == entity["entity_id"]:
+                states[i] = entity
+                break
+        else:
+            states.append(entity)
+        record_change(server, entity)
+
+
+def watch_fixtures(state_paths, services_path, servers, interval):
+    """Hot-reload HA fixtures into running servers.
+
+    state_paths maps each state fixture path to the servers mounting it;
+    the services fixture applies to all servers and is swapped in whole.
+    """
+    def on_change(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if path == services_path:
+            for server in servers:
+                server.ha_services = data
+        for server in state_paths.get(path, []):
+            reload_state(server, data)
+
+    return hotreload.watch(
+        list(state_paths) + [services_path], on_change, interval)
+
+
+def default_data_paths():
+    """Default fixture paths relative to this script (simulation/data)."""
+    base_dir = os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__)))  # simulation/
+    ha_dir = os.path.join(base_dir, "data", "homeassistant")
+    return {
+        "roku": os.path.join(ha_dir, "roku_state.json"),
+        "services": os.path.join(ha_dir, "services.json"),
+        "sensi": os.path.join(ha_dir, "sensi_state.json"),
+    }
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Run the Home Assistant simulation server")
@@ -347,69 +572,42 @@ if __name__ == "__main__":
         "SERVICES_FILE", None), help="Path to services JSON")
     parser.add_argument("--sensi-state", default=os.environ.get(
         "SENSI_STATE", None), help="Path to Sensi climate state JSON")
+    parser.add_argument("--netem-profile", default=os.environ.get(
+        "NETEM_PROFILE", None), help="Path to network emulation profile JSON")
+    parser.add_argument("--watch-interval", type=float, default=float(
+        os.environ.get("WATCH_INTERVAL", "1.0")),
+        help="Seconds between fixture change checks (0 disables hot reload)")
     args = parser.parse_args()
 
-    # Resolve default data file paths
-    base_dir = os.path.dirname(
-        os.path.dirname(os.path.abspath(__file__)))  # simulation/
-    default_roku = os.path.join(
-        base_dir, "data", "homeassistant", "roku_state.json")
-    default_services = os.path.join(
-        base_dir, "data", "homeassistant", "services.json")
-    default_sensi = os.path.join(
-        base_dir, "data", "homeassistant", "sensi_state.json")
-    roku_path = args.roku_state or default_roku
-    services_path = args.services or default_services
-    sensi_path = args.sensi_state or default_sensi
-
-    # Load initial states
-    ha_states = []
     try:
-        if os.path.exists(roku_path):
-            with open(roku_path, "r", encoding="utf-8") as f:
-                roku_state = json.load(f)
-                # Update timestamps to now
-                now_ts = datetime.utcnow().isoformat() + "Z"
-                roku_state["last_changed"] = now_ts
-                roku_state["last_updated"] = now_ts
-                ha_states.append(roku_state)
-                print(f"✅ Loaded Roku state from {roku_path}")
-    except (OSError, json.JSONDecodeError) as e:
-        print(f"Warning: failed to load roku_state.json: {e}")
+        netem_profile = netem.load_profile(args.netem_profile)
+    except ValueError as e:
+        parser.error(str(e))
 
-    # Load Sensi climate state
-    try:
-        if os.path.exists(sensi_path):
-            with open(sensi_path, "r", encoding="utf-8") as f:
-                sensi_state = json.load(f)
-                now_ts = datetime.utcnow().isoformat() + "Z"
-                sensi_state["last_changed"] = now_ts
-                sensi_state["last_updated"] = now_ts
-                ha_states.append(sensi_state)
-                print(
-                    f"✅ Loaded Sensi climate state from {sensi_path}")
-    except (OSError, json.JSONDecodeError) as e:
-        print(f"Warning: failed to load sensi_state.json: {e}")
+    # Resolve default data file paths
+    defaults = default_data_paths()
+    roku_path = args.roku_state or defaults["roku"]
+    services_path = args.services or defaults["services"]
+    sensi_path = args.sensi_state or defaults["sensi"]
 
-    # Load services
-    ha_services = {"domains": []}
-    try:
-        if os.path.exists(services_path):
-            with open(services_path, "r", encoding="utf-8") as f:
-                ha_services = json.load(f)
-                print(f"✅ Loaded services from {services_path}")
-    except (OSError, json.JSONDecodeError) as e:
-        print(f"Warning: failed to load services.json: {e}")
+    # Load initial states
+    ha_states = instantiate_states([
+        load_state_template(roku_path, "Roku"),
+        load_state_template(sensi_path, "Sensi climate"),
+    ])
+    ha_services = load_services(services_path)
 
-    server = HTTPServer((args.host, args.port), HomeAssistantHandler)
-    server.ha_states = ha_states
-    server.ha_services = ha_services
+    server = create_server(args.host, args.port, ha_states, ha_services,
+                           netem_profile)
+    watch_fixtures({roku_path: [server], sensi_path: [server]},
+                   services_path, [server], args.watch_interval)
     
     print(f"🏠 Home Assistant simulation running on {args.host}:{args.port}")
     print("   API endpoints:")
     print("   - GET  /api/")
     print("   - GET  /api/config")
     print("   - GET  /api/states")
+    print("   - GET  /api/states?since=<epoch>-<revision>")
     print("   - GET  /api/states/media_player.roku")
     print("   - GET  /api/states/climate.sensi")
     print("   - GET  /api/services")
@@ -0,0 +1,54 @@
+"""
+Background fixture watching for the simulation servers.
+
+Polls file mtimes (and sizes) from a daemon thread and hands each changed
+path to a callback. Callbacks parse the new file off the request path and
+then swap the result in, so in-flight requests keep using the old data.
+"""
+import os
+import threading
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class FileWatcher(threading.Thread):
+    """Call on_change(path) whenever one of paths changes on disk."""
+
+    def __init__(self, paths, on_change, interval=1.0):
+        super().__init__(name="fixture-watcher", daemon=True)
+        self.on_change = on_change
+        self.interval = interval
+        self.signatures = {p: _signature(p) for p in paths if p}
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            for path, old in self.signatures.items():
+                new = _signature(path)
+                if new == old or new is None:
+                    # Unchanged, or mid-replace/deleted: keep serving old data
+                    continue
+                self.signatures[path] = new
+                try:
+                    self.on_change(path)
+                    print(f"🔄 Reloaded {path}")
+                except Exception as e:  # keep watching after a bad edit
+                    print(f"Warning: failed to reload {path}: {e}")
+
+    def stop(self):
+        self.stopped.set()
+
+
+def watch(paths, on_change, interval):
+    """Start a FileWatcher, or return None if interval disables watching."""
+    if not interval or interval <= 0:
+        return None
+    watcher = FileWatcher(paths, on_change, interval)
+    watcher.start()
+    return watcher
@@ -0,0 +1,206 @@
+"""
+Network condition emulation for the simulation servers.
+
+A profile JSON describes per-route conditions so the dashboard can be
+exercised as if it were behind a congested WireGuard link:
+
+    {
+      "seed": 42,
+      "default": {"latency_ms": 40, "jitter_ms": 10},
+      "routes": [
+        {"match": "/api/*/latest.jpg",
+         "latency_ms": {"dist": "normal", "mean": 250, "stddev": 80},
+         "bandwidth_kbps": 512},
+        {"match": "/api/states*", "method": "GET",
+         "error_rate": 0.05, "error_status": 503,
+         "stall_rate": 0.01, "stall_ms": 30000}
+      ]
+    }
+
+Routes are fnmatch patterns against the request path; the first match
+wins and unmatched requests fall back to "default" (if any). Delays are
+plain sleeps in the request's own thread, so the servers must be
+threading servers for one slow client not to hold up the others.
+"""
+import fnmatch
+import json
+import random
+import time
+
+
+# Latency distributions and the numeric fields each one takes
+LATENCY_FIELDS = {
+    "fixed": ("value",),
+    "uniform": ("min", "max"),
+    "normal": ("mean", "stddev"),
+    "exponential": ("mean",),
+}
+
+
+def parse_latency(spec):
+    """Validate a latency_ms spec into (dist, {field: float}).
+
+    Raises ValueError for unknown distributions and TypeError/ValueError for
+    non-numeric fields, so bad profiles fail at load instead of per request.
+    """
+    if not isinstance(spec, dict):
+        return "fixed", {"value": float(spec)}
+    dist = spec.get("dist", "fixed")
+    if dist not in LATENCY_FIELDS:
+        raise ValueError(f"unknown latency dist {dist!r}; "
+                         f"expected one of {', '.join(LATENCY_FIELDS)}")
+    return dist, {name: float(spec.get(name, 0))
+                  for name in LATENCY_FIELDS[dist]}
+
+
+class RouteConditions:
+    """Conditions applied to requests matching one route."""
+
+    def __init__(self, spec, rng):
+        if not isinstance(spec, dict):
+            raise ValueError(f"route must be an object, got {spec!r}")
+        self.rng = rng
+        self.match = spec.get("match", "*")
+        self.method = spec.get("method")
+        if not isinstance(self.match, str) or not isinstance(
+                self.method or "", str):
+            raise ValueError("route match and method must be strings")
+        self.dist, self.latency = parse_latency(spec.get("latency_ms", 0))
+        self.jitter_ms = float(spec.get("jitter_ms", 0))
+        self.bandwidth_kbps = float(spec.get("bandwidth_kbps", 0))
+        self.error_rate = float(spec.get("error_rate", 0))
+        self.error_status = int(spec.get("error_status", 503))
+        self.stall_rate = float(spec.get("stall_rate", 0))
+        self.stall_ms = float(spec.get("stall_ms", 30000))
+        for name in ("error_rate", "stall_rate"):
+            if not 0 <= getattr(self, name) <= 1:
+                raise ValueError(f"{name} must be between 0 and 1")
+        if self.error_rate + self.stall_rate > 1:
+            raise ValueError("error_rate + stall_rate must not exceed 1")
+
+    def matches(self, method, path):
+        if self.method and self.method.upper() != method:
+            return False
+        return fnmatch.fnmatchcase(path, self.match)
+
+    def sample_delay(self):
+        """Sample latency plus jitter, in seconds (never negative)."""
+        latency = self.latency
+        if self.dist == "uniform":
+            ms = self.rng.uniform(latency["min"], latency["max"])
+        elif self.dist == "normal":
+            ms = self.rng.gauss(latency["mean"], latency["stddev"])
+        elif self.dist == "exponential":
+            mean = latency["mean"]
+            ms = self.rng.expovariate(1.0 / mean) if mean else 0
+        else:
+            ms = latency["value"]
+        if self.jitter_ms:
+            ms += self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, float(ms)) / 1000.0
+
+    def write(self, wfile, data):
+        """Write data, pacing it to bandwidth_kbps if set."""
+        if not self.bandwidth_kbps:
+            wfile.write(data)
+            return
+        bytes_per_sec = self.bandwidth_kbps * 1000 / 8
+        # ~10 writes per second keeps pacing smooth without busy looping
+        chunk = max(1, int(bytes_per_sec / 10))
+        for i in range(0, len(data), chunk):
+            piece = data[i:i + chunk]
+            wfile.write(piece)
+            wfile.flush()
+            time.sleep(len(piece) / bytes_per_sec)
+
+
+class NetworkProfile:
+    """Ordered route table loaded from a profile JSON.
+
+    Each route draws from its own generator (seeded from "seed" and the
+    route's position), so traffic on one route never shifts another's
+    sequence.
+    """
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise ValueError("profile must be a JSON object")
+        routes = spec.get("routes", [])
+        if not isinstance(routes, list):
+            raise ValueError("routes must be a list")
+        seed = spec.get("seed")
+
+        def rng(key):
+            return random.Random(f"{seed}:{key}" if seed is not None
+                                 else None)
+
+        self.routes = [RouteConditions(r, rng(i))
+                       for i, r in enumerate(routes)]
+        default = spec.get("default")
+        self.default = RouteConditions(default, rng("default")) \
+            if default is not None else None
+
+    def match(self, method, path):
+        for route in self.routes:
+            if route.matches(method, path):
+                return route
+        return self.default
+
+
+def load_profile(path):
+    """Load a network profile, or None if no path was given.
+
+    A missing or invalid profile raises ValueError: running at full speed
+    when slowness was asked for would make a broken test look like a pass.
+    """
+    if not path:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            profile = NetworkProfile(json.load(f))
+    except (OSError, TypeError, ValueError) as e:
+        raise ValueError(f"failed to load network profile {path}: {e}")
+    print(f"🐢 Loaded network profile from {path}")
+    return profile
+
+
+def apply(handler, method, path):
+    """Apply the matching route's latency, stalls and errors to a request.
+
+    Remembers the route on the handler for write_body(). Returns False when
+    the request has already been answered (or dropped) and must not be
+    dispatched further.
+    """
+    profile = getattr(handler.server, "netem_profile", None)
+    route = profile.match(method, path) if profile else None
+    handler.netem_route = route
+    if route is None:
+        return True
+
+    time.sleep(route.sample_delay())
+    roll = route.rng.random()
+    if roll < route.stall_rate:
+        # Hang, then drop the connection without answering
+        time.sleep(route.stall_ms / 1000.0)
+        handler.close_connection = True
+        return False
+    if roll < route.stall_rate + route.error_rate:
+        body = json.dumps({"message": "Injected network error",
+                           "code": route.error_status}).encode()
+        handler.send_response(route.error_status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Access-Control-Allow-Origin", "*")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        write_body(handler, body)
+        return False
+    return True
+
+
+def write_body(handler, data):
+    """Write a response body, throttled if the request's route says so."""
+    route = getattr(handler, "netem_route", None)
+    if route is None:
+        handler.wfile.write(data)
+    else:
+        route.write(handler.wfile, data)
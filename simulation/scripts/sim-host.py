@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Simulation Host
+Runs the Frigate simulation and any number of Home Assistant simulation
+instances in a single process, serving every port from one event loop.
+
+Immutable fixtures (Frigate config/events, HA services, HA state templates)
+are loaded once and shared; each HA instance gets its own deep copy of the
+entity states it serves, so service calls on one port never leak into
+another. Fixture files are watched and hot-reloaded into every server that
+mounts them. The loop only accepts connections; each request is then handled
+on its own thread, so emulated network slowness never blocks other ports.
+"""
+import argparse
+import importlib.util
+import os
+import selectors
+
+import netem
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# HA state fixtures an instance can mount, keyed by the name used in --ha
+HA_STATE_FILES = {
+    "roku": ("Roku", "roku_state.json"),
+    "sensi": ("Sensi climate", "sensi_state.json"),
+}
+
+
+def load_sim_module(name, filename):
+    """Import a sibling simulation script (hyphenated names aren't importable)."""
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(SCRIPT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def parse_ha_spec(spec):
+    """Parse an --ha value of the form PORT[:fixture,fixture...]."""
+    port, _, fixtures = spec.partition(":")
+    names = [n for n in fixtures.split(",") if n] if fixtures \
+        else list(HA_STATE_FILES)
+    unknown = [n for n in names if n not in HA_STATE_FILES]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown HA fixture(s) {', '.join(unknown)}; "
+            f"choose from {', '.join(HA_STATE_FILES)}")
+    try:
+        return int(port), names
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid port in {spec!r}")
+
+
+def accept(server):
+    """Accept one ready connection and hand it to the server.
+
+    Mirrors socketserver's own dispatch without the per-call selector that
+    handle_request() builds; the servers are threading servers, so
+    process_request() returns as soon as the handler thread starts.
+    """
+    try:
+        request, client_address = server.get_request()
+    except OSError:
+        return
+    if not server.verify_request(request, client_address):
+        server.shutdown_request(request)
+        return
+    try:
+        server.process_request(request, client_address)
+    except Exception:
+        server.handle_error(request, client_address)
+        server.shutdown_request(request)
+
+
+def serve(servers):
+    """Multiplex all servers' listening sockets on one selector loop."""
+    with selectors.DefaultSelector() as selector:
+        for server in servers:
+            selector.register(server, selectors.EVENT_READ, server)
+        try:
+            while True:
+                for key, _ in selector.select():
+                    accept(key.data)
+        finally:
+            for server in servers:
+                server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run the Frigate and Home Assistant simulations "
+                    "in one process")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"),
+                        help="Host interface to bind")
+    parser.add_argument("--frigate-port", type=int, default=int(
+        os.environ.get("FRIGATE_PORT", "5000")),
+                        help="Port for the Frigate simulation (0 disables)")
+    parser.add_argument("--ha", action="append", type=parse_ha_spec,
+                        metavar="PORT[:FIXTURES]",
+                        help="Mount an HA instance on PORT serving the "
+                             "given comma-separated state fixtures "
+                             f"({', '.join(HA_STATE_FILES)}; default all). "
+                             "Repeatable.")
+    parser.add_argument("--data-dir", default=None,
+                        help="Simulation data directory")
+    parser.add_argument("--netem-profile", default=os.environ.get(
+        "NETEM_PROFILE", None),
+                        help="Path to network emulation profile JSON "
+                             "(applied to every mounted server)")
+    parser.add_argument("--watch-interval", type=float, default=float(
+        os.environ.get("WATCH_INTERVAL", "1.0")),
+                        help="Seconds between fixture change checks "
+                             "(0 disables hot reload)")
+    args = parser.parse_args()
+    ha_specs = args.ha or [(8123, list(HA_STATE_FILES))]
+
+    frigate_sim = load_sim_module("frigate_sim", "frigate-sim.py")
+    ha_sim = load_sim_module("homeassistant_sim", "homeassistant-sim.py")
+
+    data_dir = args.data_dir or frigate_sim.resolve_data_dir()
+    if not data_dir:
+        parser.error("could not locate simulation data directory")
+    ha_dir = os.path.join(data_dir, "homeassistant")
+
+    try:
+        netem_profile = netem.load_profile(args.netem_profile)
+    except ValueError as e:
+        parser.error(str(e))
+
+    servers = []
+    if args.frigate_port:
+        config_path = os.path.join(data_dir, "config.json")
+        events_path = os.path.join(data_dir, "events.template.json")
+        frigate_server = frigate_sim.create_server(
+            args.host, args.frigate_port,
+            frigate_sim.load_fixtures(config_path, events_path),
+            netem_profile)
+        frigate_sim.watch_fixtures(frigate_server, config_path, events_path,
+                                   args.watch_interval)
+        servers.append(frigate_server)
+        print(f"🎥 Frigate simulation on {args.host}:{args.frigate_port}")
+
+    # Shared, read-only HA fixtures: loaded once regardless of instance count
+    services_path = os.path.join(ha_dir, "services.json")
+    ha_services = ha_sim.load_services(services_path)
+    needed = {name for _, names in ha_specs for name in names}
+    state_paths = {name: os.path.join(ha_dir, HA_STATE_FILES[name][1])
+                   for name in needed}
+    templates = {
+        name: ha_sim.load_state_template(
+            state_paths[name], HA_STATE_FILES[name][0])
+        for name in needed
+    }
+
+    ha_servers = []
+    mounts = {path: [] for path in state_paths.values()}
+    for port, names in ha_specs:
+        ha_states = ha_sim.instantiate_states([templates[n] for n in names])
+        ha_server = ha_sim.create_server(
+            args.host, port, ha_states, ha_services, netem_profile)
+        for name in names:
+            mounts[state_paths[name]].append(ha_server)
+        ha_servers.append(ha_server)
+        print(f"🏠 Home Assistant simulation on {args.host}:{port} "
+              f"({len(ha_states)} entities: {', '.join(names)})")
+    ha_sim.watch_fixtures(mounts, services_path, ha_servers,
+                          args.watch_interval)
+    servers.extend(ha_servers)
+
+    try:
+        serve(servers)
+    except KeyboardInterrupt:
+        pass
@@ -35,7 +35,11 @@ YESTERDAY=$((NOW - 86400))
 curl -s http://localhost:8080/api/events | jq --arg yesterday "$YESTERDAY" '[.[] | select(.start_time > ($yesterday | tonumber))] | length' | xargs -I {} echo "   Found {} events from last 24 hours"
 echo ""
 
-echo "7. Opening thumbnails..."
+echo "7. Event summary by day (server-side aggregates)..."
+curl -s "http://localhost:8080/api/events/summary?bucket=day" | jq '{count, by_camera, by_label, by_zone, days: [.buckets[] | {end_time, count}]}'
+echo ""
+
+echo "8. Opening thumbnails..."
 open /tmp/event-thumbnails/
 echo ""
 
@@ -43,4 +47,5 @@ echo "✅ Testing complete!"
 echo ""
 echo "API Endpoints tested:"
 echo "  - GET /api/events"
+echo "  - GET /api/events/summary"
 echo "  - GET /api/events/{event_id}/thumbnail.jpg"
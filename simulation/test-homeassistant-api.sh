@@ -91,4 +91,14 @@ curl -sS -X POST "$BASE_URL/api/services/climate/turn_off" \
 curl -sS "$BASE_URL/api/states/climate.sensi" | jq '{mode: .state, action: .attributes.hvac_action}'
 echo ""
 
+echo "1️⃣4️⃣ Testing incremental state deltas..."
+REV=$(curl -sS "$BASE_URL/api/states?since=0" | jq -r '.revision')
+echo "   current revision: $REV"
+curl -sS -o /dev/null -w "   unchanged since $REV -> HTTP %{http_code}\n" "$BASE_URL/api/states?since=$REV"
+curl -sS -X POST "$BASE_URL/api/services/media_player/media_pause" \
+  -H "Content-Type: application/json" \
+  -d '{"entity_id": "media_player.roku"}' > /dev/null
+curl -sS "$BASE_URL/api/states?since=$REV" | jq '{revision, changed: [.states[].entity_id]}'
+echo ""
+
 echo "✅ All Home Assistant API tests passed!"